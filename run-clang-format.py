@@ -1,45 +1,151 @@
 #!/usr/bin/env python3
 
+import argparse
+import bisect
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import hashlib
+import json
+import math
 import os
 from pathlib import Path
+import re
 import shutil
 import subprocess
-import sys
 import xml.etree.ElementTree as ElementTree
 
-SUPPORTED_FILE_EXTENSIONS = [".h", ".hpp", ".c", ".cpp", ".m", ".mm"]
+SUPPORTED_FILE_EXTENSIONS = frozenset({".h", ".hpp", ".c", ".cpp", ".m", ".mm"})
 
+# Upper bound on files passed to a single clang-format invocation when applying fixes
+CLANG_FORMAT_BATCH_SIZE = 100
+
+# Files known to be formatted are remembered in this file in the git directory, keeping the newest entries
+FORMAT_CACHE_FILENAME = "clang-format-cache.json"
+FORMAT_CACHE_MAX_ENTRIES = 4096
+FILE_HASH_CHUNK_SIZE = 64 * 1024
+
+# Escapes newlines so replacements and their surroundings fit on one warning line
+NEWLINE_ESCAPE_TABLE = str.maketrans({"\n": "\\n"})
+
+# Matches a unified diff hunk header, capturing the old and new line counts and the new start line
+DIFF_HUNK_HEADER_PATTERN = re.compile(r"^@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+# Escape sequences git uses in C-quoted paths, besides octal byte escapes
+GIT_QUOTED_PATH_ESCAPES = {"a": b"\a", "b": b"\b", "t": b"\t", "n": b"\n", "v": b"\v", "f": b"\f", "r": b"\r", "\"": b"\"", "\\": b"\\"}
+
+# Absolute path to clang-format, resolved once instead of searching PATH for every invocation
+CLANG_FORMAT_PATH = shutil.which("clang-format")
+
+@functools.lru_cache(maxsize=None)
 def find_clang_format_file(directory):
-    if os.path.exists(os.path.join(directory, ".clang-format")):
-        return directory
+    path = Path(directory)
+    # Search this directory, then keep searching up a level at a time
+    for candidate_directory in (path, *path.parents):
+        if (candidate_directory / ".clang-format").exists():
+            return candidate_directory
     
-    if Path(directory).parent == Path(directory):
-        return None
+    return None
+
+
+def map_files(function, files, jobs, *argument_lists):
+    # Each file costs a clang-format process, so spread them across a pool of
+    # workers. Results come back in order, so output stays deterministic.
+    if jobs < 2 or len(files) < 2:
+        return list(map(function, files, *argument_lists))
+    
+    with ProcessPoolExecutor(max_workers=min(jobs, len(files))) as executor:
+        return list(executor.map(function, files, *argument_lists))
+
+
+def clang_format_line_arguments(line_ranges):
+    # No line ranges means the whole file gets formatted
+    if line_ranges is None:
+        return []
     
-    # Keep searching up a level
-    return find_clang_format_file(Path(directory).parent)
+    return ["-lines={}:{}".format(first_line, last_line) for first_line, last_line in line_ranges]
 
 
-def run_clang_format(directory, should_apply_fixes):
-    if not shutil.which("clang-format"):
+def run_clang_format(directory, should_apply_fixes, jobs, changed_lines_only, use_cache, style):
+    if not CLANG_FORMAT_PATH:
         print("Error: clang-format is not installed. Please install clang-format, such as by using HomeBrew:\nbrew install clang-format")
         exit(-1)
     
-    if not find_clang_format_file(directory):
+    # Only the "file" style reads its options from a .clang-format file
+    if style == "file" and not find_clang_format_file(directory):
         print("Error: No .clang-format file found. Please generate one, such as by using the following command:\nclang-format -style=llvm -dump-config > .clang-format\n")
         exit(-1)
     
+    # "file:<path>" reads its options from the given file instead
+    if style.startswith("file:") and not os.path.isfile(style[len("file:"):]):
+        print("Error: The style file {} doesn't exist.".format(style[len("file:"):]))
+        exit(-1)
+    
     git_modified_files = get_git_modified_files()
     modified_files_in_directory = [filename for filename in git_modified_files if os.path.basename(directory) in filename]
         
+    supported_files = []
     for file in modified_files_in_directory:
-        absolute_path = os.path.join(os.getcwd(), file)
         _, extension = os.path.splitext(file)
         if extension in SUPPORTED_FILE_EXTENSIONS:
-            if should_apply_fixes:
-                apply_clang_format_fixes_on_file(absolute_path)
-            else:
-                run_clang_format_on_file(absolute_path)
+            supported_files.append(os.path.join(os.getcwd(), file))
+    
+    # Map each tracked file to the lines it changed. Untracked files are left
+    # out, which means the whole file gets formatted.
+    line_ranges_by_file = {}
+    if changed_lines_only:
+        git_modified_line_ranges = get_git_modified_line_ranges()
+        git_untracked_files = set(get_git_untracked_files())
+        for file in modified_files_in_directory:
+            if file not in git_untracked_files:
+                line_ranges_by_file[os.path.join(os.getcwd(), file)] = git_modified_line_ranges.get(file, [])
+        
+        # Files that only had lines removed, or had no hunks at all (such as
+        # mode changes), have nothing left to format
+        supported_files = [file for file in supported_files if line_ranges_by_file.get(file) != []]
+    
+    # Skip files that were already clean the last time they were checked with
+    # the same contents, configuration and line ranges
+    if use_cache:
+        format_cache_path = get_format_cache_path()
+        format_cache_keys = load_format_cache(format_cache_path)
+        known_clean_keys = set(format_cache_keys)
+        
+        file_cache_keys = {file: get_file_cache_key(file, line_ranges_by_file.get(file), style) for file in supported_files}
+        clean_keys = [file_cache_keys[file] for file in supported_files if file_cache_keys[file] in known_clean_keys]
+        supported_files = [file for file in supported_files if file_cache_keys[file] not in known_clean_keys]
+    
+    if should_apply_fixes:
+        # -lines only works with a single input file, so only whole files can be batched
+        whole_files = [file for file in supported_files if file not in line_ranges_by_file]
+        partial_files = [file for file in supported_files if file in line_ranges_by_file]
+        
+        # Split into at most one batch per job so the batches still run in parallel
+        batch_size = min(CLANG_FORMAT_BATCH_SIZE, math.ceil(len(whole_files) / max(jobs, 1))) or 1
+        batches = [whole_files[i:i+batch_size] for i in range(0, len(whole_files), batch_size)]
+        batch_line_ranges = [None] * len(batches)
+        
+        batches += [[file] for file in partial_files]
+        batch_line_ranges += [line_ranges_by_file[file] for file in partial_files]
+        results = map_files(functools.partial(apply_clang_format_fixes_batch, style=style), batches, jobs, batch_line_ranges)
+    else:
+        line_ranges = [line_ranges_by_file.get(file) for file in supported_files]
+        file_results = map_files(functools.partial(run_clang_format_on_file, style=style), supported_files, jobs, line_ranges)
+        results = [warnings for warnings, _ in file_results]
+        
+        # Remember files clang-format had nothing to change in, so they can be
+        # skipped until they change. Files whose only replacements were ignored
+        # still need formatting, so --apply-fixes mustn't skip them.
+        if use_cache:
+            new_clean_keys = [file_cache_keys[file] for file, (_, is_formatted) in zip(supported_files, file_results) if is_formatted]
+            if new_clean_keys:
+                recent_keys = clean_keys + new_clean_keys
+                recent_key_set = set(recent_keys)
+                save_format_cache(format_cache_path, [key for key in format_cache_keys if key not in recent_key_set] + recent_keys)
+    
+    # Workers only collect messages; print them here so they aren't interleaved
+    for messages in results:
+        for message in messages:
+            print(message)
     
     # Recursively walk the directory and run for all supported files
     # for root, subdirectories, files in os.walk(directory):
@@ -48,55 +154,79 @@ def run_clang_format(directory, should_apply_fixes):
     #         if extension in SUPPORTED_FILE_EXTENSIONS:
     #             run_clang_format_on_file(os.path.join(root, filename))
 
-def apply_clang_format_fixes_on_file(absolute_filename):
-    args = ["clang-format", "-style=file", absolute_filename]
-    process_result = subprocess.run(args, stdout=subprocess.PIPE)
+def apply_clang_format_fixes_batch(absolute_filenames, line_ranges=None, style="file"):
+    # clang-format rewrites each file in place with -i, so a single process can
+    # handle the whole batch instead of paying startup costs once per file
+    args = [CLANG_FORMAT_PATH, "-i", "-style={}".format(style), *clang_format_line_arguments(line_ranges), *absolute_filenames]
+    process_result = subprocess.run(args, stderr=subprocess.PIPE)
     
-    if process_result.stderr:
-        print("Error applying fixes to {}: {}".format(absolute_filename, process_result.stderr))
-    else:
-        print("Applying fixes to {}".format(absolute_filename))
-        stdout_as_string = process_result.stdout.decode("utf-8")
-        
-        with open(absolute_filename, 'w') as file:
-            file.write(stdout_as_string)
+    if process_result.returncode != 0:
+        return ["Error applying fixes to {}: {}".format(", ".join(absolute_filenames), process_result.stderr.decode("utf-8").strip())]
+    
+    return ["Applying fixes to {}".format(absolute_filename) for absolute_filename in absolute_filenames]
 
 
-def run_clang_format_on_file(absolute_filename):
-    args = ["clang-format", "-output-replacements-xml", "-style=file", absolute_filename]
-    process_result = subprocess.run(args, stdout=subprocess.PIPE)
+def run_clang_format_on_file(absolute_filename, line_ranges=None, style="file"):
+    # Returns the warnings and whether clang-format had no replacements at all,
+    # including ones should_ignore_replacement leaves out of the warnings
+    # clang-format uses bytes, not characters, as offsets and lengths, so read
+    # the file as bytes and do all of the bookkeeping on those
+    file_bytes = b""
+    with open(absolute_filename, 'rb') as file:
+        file_bytes = file.read()
     
-    replacements_xml_tree = ElementTree.fromstring(process_result.stdout)
+    newline_offsets = [match.start() for match in re.finditer(b"\n", file_bytes)]
     
-    file_string = ""
-    with open(absolute_filename, 'r', encoding="utf-8") as file:
-        file_string = file.read()
+    warnings = []
+    replacement_count = 0
     
-    for replacement in replacements_xml_tree:
-        replacement_offset_bytes = int(replacement.attrib["offset"])
-        replacement_length = int(replacement.attrib["length"])
-        replacement_line_number, replacement_column, replacement_offset = line_number_from_offset(file_string, replacement_offset_bytes)
-        replacement_text = replacement.text or ""
-        original_text = file_string[replacement_offset:replacement_offset+replacement_length]
-        
-        if should_ignore_replacement(original_text, replacement_text):
-            continue
-        
-        # Make the replacement text easier to read
-        replacement_text = replacement_text.replace("\n", "\\n")
-        
-        warning_header = "{}:{}:{}: warning: Style nit @ col {}: ".format(
-            absolute_filename,
-            replacement_line_number,
-            replacement_column,
-            replacement_column
-        )
-        
-        warning_message = build_warning_message(replacement_text, replacement_length, replacement_offset, file_string)
-        
-        warning_message_details = build_warning_message_details(replacement_text, replacement_length, replacement_offset, file_string)
-        
-        print(warning_header + warning_message + warning_message_details)
+    # Parse the replacements as clang-format writes them rather than buffering
+    # all of its output first, and drop each one once it has been handled
+    args = [CLANG_FORMAT_PATH, "-output-replacements-xml", "-style={}".format(style), *clang_format_line_arguments(line_ranges), absolute_filename]
+    with subprocess.Popen(args, stdout=subprocess.PIPE) as process:
+        # clang-format writes no XML at all for an empty file
+        if process.stdout.peek(1):
+            for _, replacement in ElementTree.iterparse(process.stdout, events=("end",)):
+                if replacement.tag == "replacement":
+                    replacement_count += 1
+                    warning = build_warning(absolute_filename, replacement, file_bytes, newline_offsets)
+                    if warning:
+                        warnings.append(warning)
+                    replacement.clear()
+    
+    # clang-format's own error goes straight to stderr. The file also stays
+    # out of the format cache.
+    if process.returncode != 0:
+        return ["Error running clang-format on {}: exit status {}".format(absolute_filename, process.returncode)], False
+    
+    return warnings, replacement_count == 0
+
+
+def build_warning(absolute_filename, replacement, file_bytes, newline_offsets):
+    replacement_offset = int(replacement.attrib["offset"])
+    replacement_length = int(replacement.attrib["length"])
+    replacement_line_number, replacement_column = line_number_from_offset(file_bytes, newline_offsets, replacement_offset)
+    replacement_text = replacement.text or ""
+    original_text = file_bytes[replacement_offset:replacement_offset+replacement_length].decode("utf-8", errors="replace")
+    
+    if should_ignore_replacement(original_text, replacement_text):
+        return None
+    
+    # Make the replacement text easier to read
+    replacement_text = replacement_text.translate(NEWLINE_ESCAPE_TABLE)
+    
+    warning_header = "{}:{}:{}: warning: Style nit @ col {}: ".format(
+        absolute_filename,
+        replacement_line_number,
+        replacement_column,
+        replacement_column
+    )
+    
+    warning_message = build_warning_message(replacement_text, replacement_length, replacement_offset, file_bytes)
+    
+    warning_message_details = build_warning_message_details(replacement_text, replacement_length, replacement_offset, file_bytes)
+    
+    return warning_header + warning_message + warning_message_details
 
 
 def should_ignore_replacement(original_text, replacement_text):
@@ -108,89 +238,258 @@ def should_ignore_replacement(original_text, replacement_text):
     return False
 
 
-def line_number_from_offset(file_string, byte_offset):
-    line_number = 1
-    column = 0
-    i = 0
-    # clang-format uses bytes, not characters, as offsets and lengths, so we'll
-    # keep track of the difference here
-    character_offset = byte_offset
+def line_number_from_offset(file_bytes, newline_offsets, byte_offset):
+    # newline_offsets holds the byte offset of every newline in the file, so
+    # the number of newlines before byte_offset gives the line
+    line_index = bisect.bisect_left(newline_offsets, byte_offset)
+    line_start = newline_offsets[line_index - 1] + 1 if line_index > 0 else 0
     
-    while i < character_offset:
-        character = file_string[i]
-        character_byte_count = len(bytes(character, 'utf8'))
-        
-        if character == '\n':
-            line_number += 1
-            column = 0
-        else:
-            column += 1
-        
-        character_offset -= character_byte_count - 1
-        i += 1
+    # Columns are counted in characters, so only decode the start of this line
+    column = len(file_bytes[line_start:byte_offset].decode("utf-8", errors="replace"))
     
-    return line_number, column, character_offset
+    return line_index + 1, column
 
 
-def build_warning_message(replacement_text, replacement_length, replacement_offset, file_string):
+def build_warning_message(replacement_text, replacement_length, replacement_offset, file_bytes):
+    original_byte = file_bytes[replacement_offset:replacement_offset+1]
+    
     if not replacement_text:
         if replacement_length == 1:
-            return "remove space" if file_string[replacement_offset] == ' ' else "remove character"
+            return "remove space" if original_byte == b' ' else "remove character"
         else:
             return "remove next {} chars".format(replacement_length)
     else:
         if replacement_length == 0:
             return "add space" if replacement_text == ' ' else "add \"{}\"".format(replacement_text)
         elif replacement_length == 1:
-            return "replace {} with \"{}\"".format("newline" if file_string[replacement_offset] == '\n' else  "char", replacement_text)
+            return "replace {} with \"{}\"".format("newline" if original_byte == b'\n' else  "char", replacement_text)
         elif replacement_length == 2 and replacement_text == ' ': # Not necessarily accurate, but most likely
             return "remove a space"
-        elif file_string[replacement_offset] == "\n" and replacement_length == 1:
+        elif original_byte == b"\n" and replacement_length == 1:
             return "remove a newline"
         elif replacement_text.find("#include") != -1 and replacement_length > len("#include "):
             return "alphabetize headers"
         else:
             return "replace next {} chars with \"{}\"".format(replacement_length, replacement_text)
 
-def build_warning_message_details(replacement_text, replacement_length, replacement_offset, file_string):
-    surrounding_character_count = 15
-    surrounding_text_start = max(0, replacement_offset - surrounding_character_count)
-    surrounding_text_end = min(len(file_string), replacement_offset + surrounding_character_count)
+def build_warning_message_details(replacement_text, replacement_length, replacement_offset, file_bytes):
+    surrounding_byte_count = 15
+    surrounding_text_start = max(0, replacement_offset - surrounding_byte_count)
+    surrounding_text_end = min(len(file_bytes), replacement_offset + surrounding_byte_count)
+    
+    surrounding_text_with_replacement = b"".join((
+        file_bytes[surrounding_text_start:replacement_offset],
+        replacement_text.encode("utf-8"),
+        file_bytes[replacement_offset+replacement_length:surrounding_text_end+replacement_length]
+    ))
     
-    surrounding_text_with_replacement = \
-        file_string[surrounding_text_start:replacement_offset] + \
-        replacement_text + \
-        file_string[replacement_offset+replacement_length:surrounding_text_end+replacement_length]
+    # Only the small window around the replacement is decoded. Errors are
+    # ignored since the window's edges can split a multi-byte character.
+    surrounding_text_with_replacement = surrounding_text_with_replacement.decode("utf-8", errors="ignore")
+    
+    return "  ➡️  …" + surrounding_text_with_replacement.translate(NEWLINE_ESCAPE_TABLE)
+
+
+@functools.lru_cache(maxsize=None)
+def get_git_repository_root():
+    return subprocess.check_output(["git", "rev-parse", "--show-toplevel"], encoding="UTF-8").strip()
+
+
+@functools.lru_cache(maxsize=None)
+def get_git_diff_base():
+    # In a repository without commits there's no HEAD to diff against, so
+    # compare with the empty tree and every tracked file counts as added
+    if subprocess.run(["git", "rev-parse", "--verify", "--quiet", "HEAD"], stdout=subprocess.DEVNULL).returncode == 0:
+        return "HEAD"
     
-    return "  ➡️  …" + surrounding_text_with_replacement.replace("\n", "\\n")
+    return subprocess.check_output(["git", "hash-object", "-t", "tree", "--stdin"], input="", encoding="UTF-8").strip()
 
+
+@functools.lru_cache(maxsize=None)
 def get_git_modified_files():
-    result = []
+    repository_root = get_git_repository_root()
     
-    status_text = subprocess.check_output("git status --short", encoding="UTF-8", shell=True)
+    # Added or modified tracked files (staged or not), listed relative to the repository root, NUL separated
+    tracked_files = subprocess.check_output(["git", "diff", "--name-only", "-z", "--diff-filter=AM", get_git_diff_base()], encoding="UTF-8", cwd=repository_root)
     
-    for line in status_text.splitlines():
-        if line.startswith("A  ") or line.startswith("AM ") or line.startswith("M  ") or line.startswith(" M ") or line.startswith("MM ") or line.startswith("?? "):
-            result.append(line[3:])
+    filenames = set(tracked_files.split("\0"))
+    filenames.discard("")
     
-    return result        
+    # Report paths relative to the working directory, like git status does
+    relative_filenames = {os.path.relpath(os.path.join(repository_root, filename)) for filename in filenames}
+    return sorted(relative_filenames.union(get_git_untracked_files()))
 
 
-if __name__ == "__main__":
-    should_apply_fixes = False
-    path_argument_index = 1
-    
-    if "--apply-fixes" in sys.argv:
-        should_apply_fixes = True
-        path_argument_index += 1
-    
-    if len(sys.argv) > path_argument_index:
-        path = sys.argv[path_argument_index]
-        # Turn into an absolute path if needed
-        if not path.startswith("/"):
-            path = os.path.join(os.getcwd(), path)
-    else:
-        path = os.getcwd()
+@functools.lru_cache(maxsize=None)
+def get_git_untracked_files():
+    repository_root = get_git_repository_root()
     
-    run_clang_format(path, should_apply_fixes)
+    # Untracked files that aren't ignored, listed relative to the repository root, NUL separated
+    untracked_files = subprocess.check_output(["git", "ls-files", "-z", "--others", "--exclude-standard"], encoding="UTF-8", cwd=repository_root)
+    
+    # Report paths relative to the working directory, like get_git_modified_files does
+    return [os.path.relpath(os.path.join(repository_root, filename)) for filename in untracked_files.split("\0") if filename]
+
+
+@functools.lru_cache(maxsize=None)
+def get_git_modified_line_ranges():
+    repository_root = get_git_repository_root()
+    
+    # Only tracked files show up here; untracked files are formatted in full
+    diff_text = subprocess.check_output(
+        # Spell out the prefixes, since diff.noprefix or diff.mnemonicPrefix would change them
+        ["git", "-c", "core.quotePath=false", "diff", "-U0", "--no-color", "--no-ext-diff", "--src-prefix=a/", "--dst-prefix=b/",
+         "--diff-filter=AM", get_git_diff_base()],
+        encoding="UTF-8",
+        errors="replace",
+        cwd=repository_root
+    )
+    
+    result = {}
+    line_ranges = None
+    hunk_lines_remaining = 0
+    
+    for line in diff_text.splitlines():
+        # "\ No newline at end of file" isn't counted as part of a hunk
+        if line.startswith("\\"):
+            continue
+        
+        # Skip hunk bodies so added lines that look like headers aren't parsed as such
+        if hunk_lines_remaining > 0:
+            hunk_lines_remaining -= 1
+            continue
+        
+        if line.startswith("+++ "):
+            # git ends the line with a tab when the path contains a space
+            filename = line[len("+++ "):]
+            if filename.endswith("\t"):
+                filename = filename[:-1]
+            
+            filename = unquote_git_path(filename)
+            if filename.startswith("b/"):
+                # Report paths relative to the working directory, like get_git_modified_files does
+                filename = os.path.relpath(os.path.join(repository_root, filename[len("b/"):]))
+                line_ranges = result.setdefault(filename, [])
+            else:
+                line_ranges = None
+            continue
+        
+        match = DIFF_HUNK_HEADER_PATTERN.match(line)
+        if match and line_ranges is not None:
+            old_line_count = int(match.group(1) or 1)
+            first_line = int(match.group(2))
+            new_line_count = int(match.group(3) or 1)
+            hunk_lines_remaining = old_line_count + new_line_count
+            
+            # Hunks that only remove lines have nothing to format
+            if new_line_count > 0:
+                line_ranges.append((first_line, first_line + new_line_count - 1))
+    
+    return result
+
 
+def unquote_git_path(path):
+    # git C-quotes paths containing quotes, backslashes or control characters,
+    # even with core.quotePath=false
+    if len(path) < 2 or not path.startswith("\"") or not path.endswith("\""):
+        return path
+    
+    result = bytearray()
+    i = 1
+    while i < len(path) - 1:
+        character = path[i]
+        if character != "\\":
+            result += character.encode("utf-8")
+            i += 1
+        elif path[i+1] in "01234567":
+            # Octal escapes are single bytes of the UTF-8 encoded path
+            result.append(int(path[i+1:i+4], 8))
+            i += 4
+        else:
+            result += GIT_QUOTED_PATH_ESCAPES.get(path[i+1], path[i+1].encode("utf-8"))
+            i += 2
+    
+    return result.decode("utf-8", errors="replace")
+
+
+def get_format_cache_path():
+    return subprocess.check_output(["git", "rev-parse", "--git-path", FORMAT_CACHE_FILENAME], encoding="UTF-8").strip()
+
+
+def load_format_cache(format_cache_path):
+    # A missing or unreadable cache just means every file gets checked
+    try:
+        with open(format_cache_path, 'r', encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return []
+
+
+def save_format_cache(format_cache_path, keys):
+    # Write to a temporary file first so a concurrent run never reads a partial cache
+    temporary_path = "{}.{}".format(format_cache_path, os.getpid())
+    try:
+        with open(temporary_path, 'w', encoding="utf-8") as file:
+            json.dump(keys[-FORMAT_CACHE_MAX_ENTRIES:], file)
+        os.replace(temporary_path, format_cache_path)
+    except OSError as error:
+        print("Warning: couldn't save {}: {}".format(format_cache_path, error))
+
+
+@functools.lru_cache(maxsize=None)
+def get_clang_format_config_hash(directory, style):
+    # Everything besides the file itself that affects clang-format's output:
+    # the clang-format binary, the style and, for the "file" styles, the
+    # contents of the config file they read
+    config_hash = hashlib.blake2b(digest_size=16)
+    
+    clang_format_stat = os.stat(CLANG_FORMAT_PATH)
+    config_hash.update("{}:{}:{}".format(CLANG_FORMAT_PATH, clang_format_stat.st_size, clang_format_stat.st_mtime_ns).encode("utf-8"))
+    
+    config_hash.update(style.encode("utf-8"))
+    
+    if style == "file":
+        clang_format_directory = find_clang_format_file(directory)
+        if clang_format_directory:
+            config_hash.update((clang_format_directory / ".clang-format").read_bytes())
+    elif style.startswith("file:"):
+        config_hash.update(Path(style[len("file:"):]).read_bytes())
+    
+    return config_hash.digest()
+
+
+def get_file_cache_key(absolute_filename, line_ranges, style):
+    key = hashlib.blake2b(digest_size=16)
+    key.update(get_clang_format_config_hash(os.path.dirname(absolute_filename), style))
+    key.update(repr(line_ranges).encode("utf-8"))
+    
+    # Hash in chunks, since with --apply-fixes the file is never otherwise read into memory
+    with open(absolute_filename, 'rb') as file:
+        for chunk in iter(functools.partial(file.read, FILE_HASH_CHUNK_SIZE), b""):
+            key.update(chunk)
+    
+    return key.hexdigest()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Displays clang-format's suggested changes as Xcode warnings")
+    parser.add_argument("--apply-fixes", action="store_true",
+                        help="rewrite modified files in place instead of printing warnings")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="number of files to format in parallel (default: number of CPUs)")
+    parser.add_argument("--changed-lines-only", action="store_true",
+                        help="only format the lines changed since HEAD in tracked files")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="check every file, even ones that were clean the last time they were checked")
+    parser.add_argument("--style", default="file",
+                        help="clang-format style, such as WebKit, LLVM or file:<path> (default: file, which reads .clang-format)")
+    parser.add_argument("path", nargs="?", default=os.getcwd(),
+                        help="directory to check (default: current directory)")
+    arguments = parser.parse_args()
+    
+    path = arguments.path
+    # Turn into an absolute path if needed
+    if not path.startswith("/"):
+        path = os.path.join(os.getcwd(), path)
+    
+    run_clang_format(path, arguments.apply_fixes, arguments.jobs, arguments.changed_lines_only, not arguments.no_cache, arguments.style)